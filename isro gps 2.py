@@ -3,15 +3,26 @@ import os
 import time
 import re
 import math
-import requests
+import asyncio
+import aiohttp
+import qasync
 import xml.etree.ElementTree as ET
 import json
 import base64
+import mmap
+import string
+import functools
 import traceback
 
+try:
+    import orjson  # optional, faster JSON encoding/decoding
+except ImportError:
+    orjson = None
+
 from PyQt5.QtWidgets import *
 from PyQt5.QtWebEngineWidgets import QWebEngineView
-from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtGui import QTextCursor
+from PyQt5.QtCore import Qt, QTimer, QUrl
 
 
 # ==========================================
@@ -31,15 +42,106 @@ def exception_hook(exctype, value, tb):
 sys.excepthook = exception_hook
 
 
+# ==========================================
+# TELEMETRY PATTERNS
+# ==========================================
+LAT_RE = re.compile(r"(?:Latitude|Lat|LAT)[^\d-]*([-\d\.]+)", re.IGNORECASE)
+LON_RE = re.compile(r"(?:Longitude|Lon|LON)[^\d-]*([-\d\.]+)", re.IGNORECASE)
+H_RE = re.compile(r"(?:HEADING|H)[:\s]*([\d\.]+)", re.IGNORECASE)
+N_RE = re.compile(r"(?:NORTH|N)[:\s]*([-\d\.]+)", re.IGNORECASE)
+E_RE = re.compile(r"(?:EAST|E)[:\s]*([-\d\.]+)", re.IGNORECASE)
+
+_D2R = math.pi / 180.0
+
+_jload = orjson.loads if orjson else json.loads
+
+
+def _jdump(obj):
+    if orjson: return orjson.dumps(obj).decode('utf-8')
+    return json.dumps(obj, separators=(",", ":"))
+
+
+def _json_fields(body):
+    # Firmware that speaks JSON skips the regex scrape entirely
+    try:
+        data = _jload(body)
+    except ValueError:
+        return None
+    if not isinstance(data, dict): return None
+    return {str(k).lower(): v for k, v in data.items()}
+
+
+def _first(fields, *keys):
+    for key in keys:
+        if fields.get(key) is not None:
+            return fields[key]
+    return None
+
+
+def _json_number(value):
+    # Only finite real numbers count; bools, NaN/Infinity and "nan"/"inf" don't
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+def parse_outdoor_fix(body):
+    fields = _json_fields(body)
+    if fields is not None:
+        # A JSON body is authoritative: a null/missing field means no fix yet
+        lat = _json_number(_first(fields, 'lat', 'latitude'))
+        lon = _json_number(_first(fields, 'lon', 'longitude'))
+        if lat is None or lon is None:
+            return None
+        return lat, lon
+
+    text = body.decode('utf-8', 'replace')
+    lat_m = LAT_RE.search(text)
+    lon_m = LON_RE.search(text)
+    if lat_m and lon_m:
+        return float(lat_m.group(1)), float(lon_m.group(1))
+    return None
+
+
+def parse_imu_sample(body):
+    fields = _json_fields(body)
+    if fields is not None:
+        north = _json_number(_first(fields, 'north', 'n'))
+        east = _json_number(_first(fields, 'east', 'e'))
+        if north is None or east is None:
+            return None
+        heading = _first(fields, 'heading', 'h')
+        if heading is None:
+            return north, east, 0.0
+        heading = _json_number(heading)
+        if heading is None:
+            return None
+        return north, east, heading
+
+    text = body.decode('utf-8', 'replace')
+    h_m = H_RE.search(text)
+    n_m = N_RE.search(text)
+    e_m = E_RE.search(text)
+    if n_m and e_m:
+        return float(n_m.group(1)), float(e_m.group(1)), float(h_m.group(1)) if h_m else 0.0
+    return None
+
+
 # ==========================================
 # HELPER: LOAD IMAGES
 # ==========================================
+@functools.lru_cache(maxsize=None)
 def load_image_as_base64(filename):
     path = os.path.join("assets", filename)
     if not os.path.exists(path): return ""
     try:
         with open(path, "rb") as image_file:
-            encoded = base64.b64encode(image_file.read()).decode('utf-8')
+            with mmap.mmap(image_file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                encoded = base64.b64encode(mm).decode('ascii')
             return f"data:image/png;base64,{encoded}"
     except:
         return ""
@@ -51,42 +153,179 @@ def load_image_as_base64(filename):
 def parse_osm_to_geojson(osm_file_path):
     if not os.path.exists(osm_file_path): return None
     try:
-        tree = ET.parse(osm_file_path)
-        root = tree.getroot()
         nodes = {}
         features = []
-
-        for node in root.findall('node'):
-            nodes[node.get('id')] = (float(node.get('lon')), float(node.get('lat')))
-
-        for way in root.findall('way'):
-            coords = []
-            tags = {tag.get('k'): tag.get('v') for tag in way.findall('tag')}
-            for nd in way.findall('nd'):
-                ref = nd.get('ref')
-                if ref in nodes: coords.append(nodes[ref])
-
-            if len(coords) > 1:
-                ftype = "other"
-                if 'building' in tags:
-                    ftype = "building"
-                elif 'highway' in tags:
-                    ftype = "road"
-
-                gtype = "Polygon" if ftype == "building" else "LineString"
-                if gtype == "Polygon": coords = [coords]
-
-                features.append({
-                    "type": "Feature",
-                    "geometry": {"type": gtype, "coordinates": coords},
-                    "properties": {"type": ftype}
-                })
-
-        return json.dumps({"type": "FeatureCollection", "features": features})
+        root = None
+        way_coords = []
+        way_tags = {}
+
+        # Stream the file so only one node/way is held in memory at a time.
+        # <nd>/<tag> children are folded into the accumulators as they close.
+        for event, elem in ET.iterparse(osm_file_path, events=("start", "end")):
+            if root is None:
+                root = elem
+            if event != "end":
+                continue
+
+            tag = elem.tag
+            if tag == 'nd':
+                ref = elem.attrib['ref']
+                if ref in nodes: way_coords.append(nodes[ref])
+                continue
+            elif tag == 'tag':
+                way_tags[elem.attrib['k']] = elem.attrib['v']
+                continue
+            elif tag == 'node':
+                attrib = elem.attrib
+                nodes[attrib['id']] = (float(attrib['lon']), float(attrib['lat']))
+            elif tag == 'way':
+                if len(way_coords) > 1:
+                    ftype = "other"
+                    if 'building' in way_tags:
+                        ftype = "building"
+                    elif 'highway' in way_tags:
+                        ftype = "road"
+
+                    gtype = "Polygon" if ftype == "building" else "LineString"
+                    coords = [way_coords] if gtype == "Polygon" else way_coords
+
+                    features.append({
+                        "type": "Feature",
+                        "geometry": {"type": gtype, "coordinates": coords},
+                        "properties": {"type": ftype}
+                    })
+            elif tag != 'relation':
+                continue
+
+            # Finished a top-level element: reset accumulators and drop it from the tree
+            way_coords = []
+            way_tags = {}
+            root.clear()
+
+        return _jdump({"type": "FeatureCollection", "features": features})
     except:
         return None
 
 
+def load_osm_geojson(osm_file_path, prebuilt_path):
+    # Prefer the GeoJSON written by tools/build_map.py unless map.osm is newer
+    if os.path.exists(prebuilt_path):
+        if not os.path.exists(osm_file_path) or os.path.getmtime(prebuilt_path) >= os.path.getmtime(osm_file_path):
+            with open(prebuilt_path, "r") as f:
+                return f.read()
+    return parse_osm_to_geojson(osm_file_path)
+
+
+# ==========================================
+# MAP TEMPLATE
+# ==========================================
+# string.Template only scans the template itself, so the large inlined
+# assets are copied in once instead of being re-interpolated.
+# Leaflet is loaded by URL relative to the assets folder (the page's base URL),
+# so Chromium parses and caches it as a file instead of inline script.
+MAP_TEMPLATE = string.Template("""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <meta charset="utf-8"/>
+        <link rel="stylesheet" href="leaflet.css"/>
+        <script src="leaflet.js"></script>
+        <style>
+            html, body, #map { height: 100%; margin: 0; background: #050a14; }
+            #hud {
+                position: absolute; top: 20px; right: 20px; z-index: 1000;
+                background: rgba(5,10,20,0.85); border-left: 4px solid #3b82f6;
+                color: #e2e8f0; padding: 15px; font-family: monospace;
+                min-width: 180px;
+            }
+        </style>
+    </head>
+    <body>
+        <div id="map"></div>
+        <div id="hud">
+            <div>LAT: <span id="lat" style="color:#10b981">--</span></div>
+            <div>LON: <span id="lon" style="color:#10b981">--</span></div>
+            <div>HDG: <span id="hdg" style="color:#10b981">--</span></div>
+        </div>
+        <script>
+            var map = L.map('map', {zoomControl:false}).setView([$lat, $lon], 19);
+
+            var osm = $osm_data;
+            if(osm) {
+                L.geoJSON(osm, {
+                    style: function(f) {
+                        return f.properties.type === 'road' ? {color: "#0ea5e9", weight: 2} : 
+                               f.properties.type === 'building' ? {color: "#1e293b", weight: 1, fillColor: "#334155", fillOpacity: 0.4} : 
+                               {color: "#333", weight: 1};
+                    }
+                }).addTo(map);
+            }
+
+            var iconOut = L.icon({iconUrl: '$img_outdoor', iconSize: [25, 41], iconAnchor: [12, 41], popupAnchor: [1, -34]});
+            var iconStart = L.icon({iconUrl: '$img_start', iconSize: [25, 41], iconAnchor: [12, 41], popupAnchor: [1, -34]});
+            var iconDrone = L.icon({iconUrl: '$img_drone', iconSize: [25, 41], iconAnchor: [12, 41], popupAnchor: [1, -34]});
+
+            var mkOut, mkIn, mkCur, pathLine, pathCoords = [];
+
+            function setStartPoint(ilat, ilon, olat, olon) {
+                if(mkOut) map.removeLayer(mkOut);
+                if(mkIn) map.removeLayer(mkIn);
+                if(mkCur) map.removeLayer(mkCur);
+                if(pathLine) map.removeLayer(pathLine);
+                pathCoords = [];
+
+                // FORCE JUMP
+                map.setView([ilat, ilon], 20);
+
+                mkOut = L.marker([olat, olon], {icon: iconOut}).addTo(map);
+                mkIn = L.marker([ilat, ilon], {icon: iconStart}).addTo(map);
+                mkCur = L.marker([ilat, ilon], {icon: iconDrone, zIndexOffset:1000}).addTo(map);
+
+                L.polyline([[olat, olon], [ilat, ilon]], {color:'#64748b', dashArray:'4,8'}).addTo(map);
+                pathCoords.push([ilat, ilon]);
+                pathLine = L.polyline(pathCoords, {color:'#eab308', weight:3}).addTo(map);
+
+                updInfo(ilat, ilon, 0);
+            }
+
+            function updatePosition(lat, lon, h) {
+                updatePositions([[lat, lon, h]]);
+            }
+
+            function updatePositions(batch) {
+                if(!mkCur || !batch.length) return;
+                for(var i = 0; i < batch.length; i++) pathCoords.push([batch[i][0], batch[i][1]]);
+                var last = batch[batch.length - 1];
+                mkCur.setLatLng([last[0], last[1]]);
+                pathLine.setLatLngs(pathCoords);
+                updInfo(last[0], last[1], last[2]);
+            }
+
+            function updInfo(lat, lon, h) {
+                document.getElementById('lat').innerText = lat.toFixed(6);
+                document.getElementById('lon').innerText = lon.toFixed(6);
+                document.getElementById('hdg').innerText = parseInt(h);
+            }
+        </script>
+    </body>
+    </html>
+    """)
+
+
+@functools.lru_cache(maxsize=1)
+def _load_map_assets():
+    for name in ("leaflet.css", "leaflet.js"):
+        path = os.path.join("assets", name)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Missing {path}")
+    return {
+        "osm_data": load_osm_geojson("assets/map.osm", "assets/map.geojson.min") or "null",
+        "img_outdoor": load_image_as_base64("outdoor.png"),
+        "img_start": load_image_as_base64("start.png"),
+        "img_drone": load_image_as_base64("drone.png"),
+    }
+
+
 # ==========================================
 # MAIN CLASS
 # ==========================================
@@ -95,9 +334,10 @@ class NavigationDashboard(QWidget):
         super().__init__()
         self.is_tracking = False
 
-        # PROXY KILLER
-        self.session = requests.Session()
-        self.session.trust_env = False
+        # PROXY KILLER (session is created lazily inside the running event loop)
+        self.http = None
+        self._outdoor_task = None
+        self._indoor_task = None
 
         if not os.path.exists("assets"):
             QMessageBox.critical(self, "Setup Error", "The 'assets' folder is missing!")
@@ -112,8 +352,12 @@ class NavigationDashboard(QWidget):
         self.anchor_lon = 0.0
         self.indoor_start_lat = 0.0
         self.indoor_start_lon = 0.0
+        # Metres -> degrees factors for the IMU offsets, fixed per start point
+        self._inv_lat = 1.0 / 111132.0
+        self._inv_lon = 1.0 / 111132.0
         self.outdoor_final_url = ""
         self.indoor_final_url = ""
+        self.indoor_final_url_data = ""
 
         # UI
         self.setWindowTitle("ISRO GPS - Tactical Display")
@@ -162,6 +406,7 @@ class NavigationDashboard(QWidget):
 
         self.console = QTextEdit()
         self.console.setReadOnly(True)
+        self.console.document().setMaximumBlockCount(500)
         self.console.setStyleSheet(
             "background:#020617; color:#10b981; border:1px solid #1e293b; font-family: Consolas, monospace; font-size:11px;")
         sb.addWidget(self.console)
@@ -170,7 +415,8 @@ class NavigationDashboard(QWidget):
 
         # Map
         self.map_view = QWebEngineView()
-        self.map_view.setHtml(self.get_offline_map_html(self.view_lat, self.view_lon))
+        base_url = QUrl.fromLocalFile(os.path.join(os.path.abspath("assets"), ""))
+        self.map_view.setHtml(self.get_offline_map_html(self.view_lat, self.view_lon), base_url)
         main_layout.addWidget(self.map_view)
 
         # Timer
@@ -178,13 +424,20 @@ class NavigationDashboard(QWidget):
         self.outdoor_timer.timeout.connect(self.poll_outdoor_gps)
         self.outdoor_timer.setInterval(1000)
 
-        self.indoor_timer = QTimer()
-        self.indoor_timer.timeout.connect(self.poll_indoor_imu)
-        self.indoor_timer.setInterval(250)
+        # Indoor IMU is polled by an asyncio task (see _indoor_reader), not a QTimer
+        self.indoor_period = 0.25
+        self.indoor_retry = 1.0
+
+        # IMU samples are buffered and pushed to the map in one JS call
+        self._pending = []
+        self._last_pushed = None
+        self.flush_timer = QTimer()
+        self.flush_timer.timeout.connect(self._flush_js)
+        self.flush_timer.setInterval(500)
 
     def log(self, msg):
         self.console.append(f"[{time.strftime('%H:%M:%S')}] {msg}")
-        self.console.verticalScrollBar().setValue(self.console.verticalScrollBar().maximum())
+        self.console.moveCursor(QTextCursor.End)
 
     def format_url(self, ip):
         url = ip.strip()
@@ -207,9 +460,10 @@ class NavigationDashboard(QWidget):
             self.lbl_status.setText("SEARCHING FOR GPS...")
             self.lbl_status.setStyleSheet("color:#fbbf24;")
 
-            base_out = self.format_url(self.input_outdoor_ip.text())
-            self.outdoor_final_url = base_out + "/data"
+            # URLs are fixed for the whole session, build them once here
+            self.outdoor_final_url = f"{self.format_url(self.input_outdoor_ip.text())}/data"
             self.indoor_final_url = self.format_url(self.input_indoor_ip.text())
+            self.indoor_final_url_data = f"{self.indoor_final_url}/data"
 
             self.cached_dist = dist
             self.cached_deg = deg
@@ -219,7 +473,8 @@ class NavigationDashboard(QWidget):
             self.btn_start.setStyleSheet("background:#ef4444;")
 
             self.outdoor_timer.start()
-            self.indoor_timer.start()
+            self.flush_timer.start()
+            self._indoor_task = asyncio.ensure_future(self._indoor_reader())
 
             # --- CHANGE: DO NOT DRAW PINS YET ---
             # self.calculate_indoor_start(dist, deg) <--- REMOVED
@@ -229,7 +484,10 @@ class NavigationDashboard(QWidget):
         else:
             self.is_tracking = False
             self.outdoor_timer.stop()
-            self.indoor_timer.stop()
+            self.flush_timer.stop()
+            for task in (self._outdoor_task, self._indoor_task):
+                if task: task.cancel()
+            self._flush_js()
 
             # Reset Anchors on Stop so we can restart fresh
             self.anchor_lat = 0.0
@@ -240,18 +498,45 @@ class NavigationDashboard(QWidget):
             self.lbl_status.setText("STANDBY")
             self.log("Stopped.")
 
-    def poll_outdoor_gps(self):
-        try:
-            r = self.session.get(self.outdoor_final_url, timeout=1)
-            lat_m = re.search(r"(?:Latitude|Lat|LAT)[^\d-]*([-\d\.]+)", r.text, re.IGNORECASE)
-            lon_m = re.search(r"(?:Longitude|Lon|LON)[^\d-]*([-\d\.]+)", r.text, re.IGNORECASE)
+    def get_http(self):
+        if self.http is None or self.http.closed:
+            # One kept-alive socket per module, DNS resolved once for the session
+            connector = aiohttp.TCPConnector(limit_per_host=2, keepalive_timeout=30,
+                                             use_dns_cache=True, ttl_dns_cache=None)
+            self.http = aiohttp.ClientSession(connector=connector, trust_env=False,
+                                              headers={"Connection": "keep-alive"},
+                                              timeout=aiohttp.ClientTimeout(total=1, sock_connect=0.5))
+        return self.http
+
+    async def shutdown(self):
+        # Run once the Qt loop has ended: finish pending polls, then close the session
+        tasks = [t for t in (self._outdoor_task, self._indoor_task) if t and not t.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self.http is not None and not self.http.closed:
+            await self.http.close()
 
-            if lat_m and lon_m:
-                new_lat = float(lat_m.group(1))
-                new_lon = float(lon_m.group(1))
+    def poll_outdoor_gps(self):
+        # Skip the tick while the previous request is still in flight
+        if self._outdoor_task and not self._outdoor_task.done():
+            return
+        self._outdoor_task = asyncio.ensure_future(self._poll_outdoor())
 
-                # Update Anchor if it changes OR if it's the very first lock (0.0)
-                if abs(new_lat - self.anchor_lat) > 0.000001 or self.anchor_lat == 0.0:
+    async def _poll_outdoor(self):
+        try:
+            async with self.get_http().get(self.outdoor_final_url) as r:
+                body = await r.read()
+            fix = parse_outdoor_fix(body)
+
+            if fix:
+                new_lat, new_lon = fix
+
+                # Update Anchor on the very first lock (0.0) OR on real motion (~1 m),
+                # so stationary GPS jitter doesn't redraw the pins every second
+                first_lock = self.anchor_lat == 0.0
+                moved = abs(new_lat - self.anchor_lat) > 0.00001 or abs(new_lon - self.anchor_lon) > 0.00001
+                if first_lock or moved:
                     self.anchor_lat = new_lat
                     self.anchor_lon = new_lon
 
@@ -264,7 +549,7 @@ class NavigationDashboard(QWidget):
 
                     # NOW we draw the pins
                     self.calculate_indoor_start(self.cached_dist, self.cached_deg)
-        except:
+        except Exception:
             pass
 
     def calculate_indoor_start(self, dist, deg):
@@ -279,151 +564,100 @@ class NavigationDashboard(QWidget):
             self.indoor_start_lat = alat
             self.indoor_start_lon = alon
         else:
-            rad = math.radians(deg)
-            cos_lat = math.cos(math.radians(alat))
+            rad = deg * _D2R
+            sin_hdg, cos_hdg = math.sin(rad), math.cos(rad)
+            cos_lat = math.cos(alat * _D2R)
             if abs(cos_lat) < 0.0001: cos_lat = 0.0001
-            self.indoor_start_lat = alat + (dist * math.cos(rad) / 111132.0)
-            self.indoor_start_lon = alon + (dist * math.sin(rad) / (111132.0 * cos_lat))
+            self.indoor_start_lat = alat + (dist * cos_hdg / 111132.0)
+            self.indoor_start_lon = alon + (dist * sin_hdg / (111132.0 * cos_lat))
+
+        cos_lat = math.cos(self.indoor_start_lat * _D2R)
+        if abs(cos_lat) < 0.0001: cos_lat = 0.0001
+        self._inv_lat = 1.0 / 111132.0
+        self._inv_lon = 1.0 / (111132.0 * cos_lat)
+
+        # Samples taken against the old start point are stale now
+        self._pending.clear()
+        self._last_pushed = None
 
         # JS Call: Centers map on the REAL GPS location
         js = f"setStartPoint({self.indoor_start_lat}, {self.indoor_start_lon}, {alat}, {alon});"
         self.map_view.page().runJavaScript(js)
 
-    def poll_indoor_imu(self):
+    async def _indoor_reader(self):
+        # The IMU only answers HTTP requests, there is no push channel to wait on.
+        # Poll every indoor_period (a slow response delays the next request rather
+        # than overlapping it), backing off to indoor_retry while unreachable.
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            got = await self._poll_indoor()
+            delay = self.indoor_retry if got is False else self.indoor_period
+            await asyncio.sleep(max(0.0, started + delay - loop.time()))
+
+    async def _poll_indoor(self):
         # Don't poll IMU if we don't have a start point yet
         if self.anchor_lat == 0.0:
-            return
+            return None
 
-        if not self.do_imu_request(self.indoor_final_url + "/data"):
-            self.do_imu_request(self.indoor_final_url)
+        if await self.do_imu_request(self.indoor_final_url_data):
+            return True
+        return await self.do_imu_request(self.indoor_final_url)
 
-    def do_imu_request(self, url):
+    async def do_imu_request(self, url):
         try:
-            r = self.session.get(url, timeout=1.0)
+            async with self.get_http().get(url) as r:
+                body = await r.read()
+            sample = parse_imu_sample(body)
 
-            h_m = re.search(r"(?:HEADING|H)[:\s]*([\d\.]+)", r.text, re.IGNORECASE)
-            n_m = re.search(r"(?:NORTH|N)[:\s]*([-\d\.]+)", r.text, re.IGNORECASE)
-            e_m = re.search(r"(?:EAST|E)[:\s]*([-\d\.]+)", r.text, re.IGNORECASE)
+            if sample:
+                north, east, heading = sample
+                dlat = north * self._inv_lat
+                dlon = east * self._inv_lon
 
-            if n_m and e_m:
-                cos_lat = math.cos(math.radians(self.indoor_start_lat))
-                if abs(cos_lat) < 0.0001: cos_lat = 0.0001
+                new_lat = self.indoor_start_lat + dlat
+                new_lon = self.indoor_start_lon + dlon
 
-                dlat = float(n_m.group(1)) / 111132.0
-                dlon = float(e_m.group(1)) / (111132.0 * cos_lat)
-                heading = float(h_m.group(1)) if h_m else 0.0
+                # Skip samples that wouldn't move the marker on screen (~1 cm / 0.5 deg)
+                last = self._last_pushed
+                if last and abs(new_lat - last[0]) < 1e-7 and abs(new_lon - last[1]) < 1e-7 and abs(heading - last[2]) < 0.5:
+                    return True
 
-                js = f"updatePosition({self.indoor_start_lat + dlat}, {self.indoor_start_lon + dlon}, {heading});"
-                self.map_view.page().runJavaScript(js)
+                self._last_pushed = (new_lat, new_lon, heading)
+                self._pending.append(self._last_pushed)
                 return True
             else:
                 return False
 
-        except requests.exceptions.ConnectTimeout:
+        except asyncio.TimeoutError:
             self.log("Indoor: TIMEOUT")
             return False
-        except:
+        except Exception:
             return False
 
+    def _flush_js(self):
+        if not self._pending:
+            return
+        js = f"updatePositions({_jdump(self._pending)});"
+        self._pending = []
+        self.map_view.page().runJavaScript(js)
+
     def get_offline_map_html(self, lat, lon):
         try:
-            with open("assets/leaflet.css", "r") as f:
-                css = f.read()
-            with open("assets/leaflet.js", "r") as f:
-                js = f.read()
-            osm_data = parse_osm_to_geojson("assets/map.osm") or "null"
-            img_outdoor = load_image_as_base64("outdoor.png")
-            img_start = load_image_as_base64("start.png")
-            img_drone = load_image_as_base64("drone.png")
+            assets = _load_map_assets()
         except Exception as e:
             return f"<html><body style='background:black;color:red'><h1>ASSET ERROR</h1><p>{e}</p></body></html>"
 
-        return f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8"/>
-            <style>{css}</style>
-            <script>{js}</script>
-            <style>
-                html, body, #map {{ height: 100%; margin: 0; background: #050a14; }}
-                #hud {{
-                    position: absolute; top: 20px; right: 20px; z-index: 1000;
-                    background: rgba(5,10,20,0.85); border-left: 4px solid #3b82f6;
-                    color: #e2e8f0; padding: 15px; font-family: monospace;
-                    min-width: 180px;
-                }}
-            </style>
-        </head>
-        <body>
-            <div id="map"></div>
-            <div id="hud">
-                <div>LAT: <span id="lat" style="color:#10b981">--</span></div>
-                <div>LON: <span id="lon" style="color:#10b981">--</span></div>
-                <div>HDG: <span id="hdg" style="color:#10b981">--</span></div>
-            </div>
-            <script>
-                var map = L.map('map', {{zoomControl:false}}).setView([{lat}, {lon}], 19);
-
-                var osm = {osm_data};
-                if(osm) {{
-                    L.geoJSON(osm, {{
-                        style: function(f) {{
-                            return f.properties.type === 'road' ? {{color: "#0ea5e9", weight: 2}} : 
-                                   f.properties.type === 'building' ? {{color: "#1e293b", weight: 1, fillColor: "#334155", fillOpacity: 0.4}} : 
-                                   {{color: "#333", weight: 1}};
-                        }}
-                    }}).addTo(map);
-                }}
-
-                var iconOut = L.icon({{iconUrl: '{img_outdoor}', iconSize: [25, 41], iconAnchor: [12, 41], popupAnchor: [1, -34]}});
-                var iconStart = L.icon({{iconUrl: '{img_start}', iconSize: [25, 41], iconAnchor: [12, 41], popupAnchor: [1, -34]}});
-                var iconDrone = L.icon({{iconUrl: '{img_drone}', iconSize: [25, 41], iconAnchor: [12, 41], popupAnchor: [1, -34]}});
-
-                var mkOut, mkIn, mkCur, pathLine, pathCoords = [];
-
-                function setStartPoint(ilat, ilon, olat, olon) {{
-                    if(mkOut) map.removeLayer(mkOut);
-                    if(mkIn) map.removeLayer(mkIn);
-                    if(mkCur) map.removeLayer(mkCur);
-                    if(pathLine) map.removeLayer(pathLine);
-                    pathCoords = [];
-
-                    // FORCE JUMP
-                    map.setView([ilat, ilon], 20);
-
-                    mkOut = L.marker([olat, olon], {{icon: iconOut}}).addTo(map);
-                    mkIn = L.marker([ilat, ilon], {{icon: iconStart}}).addTo(map);
-                    mkCur = L.marker([ilat, ilon], {{icon: iconDrone, zIndexOffset:1000}}).addTo(map);
-
-                    L.polyline([[olat, olon], [ilat, ilon]], {{color:'#64748b', dashArray:'4,8'}}).addTo(map);
-                    pathCoords.push([ilat, ilon]);
-                    pathLine = L.polyline(pathCoords, {{color:'#eab308', weight:3}}).addTo(map);
-
-                    updInfo(ilat, ilon, 0);
-                }}
-
-                function updatePosition(lat, lon, h) {{
-                    if(!mkCur) return;
-                    mkCur.setLatLng([lat, lon]);
-                    pathCoords.push([lat, lon]);
-                    pathLine.setLatLngs(pathCoords);
-                    updInfo(lat, lon, h);
-                }}
-
-                function updInfo(lat, lon, h) {{
-                    document.getElementById('lat').innerText = lat.toFixed(6);
-                    document.getElementById('lon').innerText = lon.toFixed(6);
-                    document.getElementById('hdg').innerText = parseInt(h);
-                }}
-            </script>
-        </body>
-        </html>
-        """
+        return MAP_TEMPLATE.substitute(assets, lat=lat, lon=lon)
 
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+    loop = qasync.QEventLoop(app)
+    asyncio.set_event_loop(loop)
     window = NavigationDashboard()
     window.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    with loop:
+        exit_code = loop.run_forever()
+        loop.run_until_complete(window.shutdown())
+    sys.exit(exit_code)
\ No newline at end of file
@@ -0,0 +1,33 @@
+import sys
+import os
+import importlib.util
+
+# Precompute assets/map.geojson.min from assets/map.osm so the dashboard
+# doesn't have to convert the OSM XML on every launch.
+#
+# Usage (from the repo root):  python tools/build_map.py [map.osm] [map.geojson.min]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_dashboard():
+    spec = importlib.util.spec_from_file_location("dashboard", os.path.join(ROOT, "isro gps 2.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    # The dashboard installs a Qt crash dialog; plain tracebacks are wanted here
+    sys.excepthook = sys.__excepthook__
+    return module
+
+
+if __name__ == "__main__":
+    osm_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, "assets", "map.osm")
+    out_path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(ROOT, "assets", "map.geojson.min")
+
+    geojson = load_dashboard().parse_osm_to_geojson(osm_path)
+    if geojson is None:
+        print(f"ERR: could not parse {osm_path}")
+        sys.exit(1)
+
+    with open(out_path, "w") as f:
+        f.write(geojson)
+    print(f"Wrote {out_path} ({len(geojson)} bytes)")